@@ -1,23 +1,50 @@
 #!/usr/bin/env python3
 
+from concurrent.futures import ThreadPoolExecutor
 from core.logger import Logger
 from logging import FileHandler, Formatter, DEBUG, INFO
+from requests.adapters import HTTPAdapter
 from requests.exceptions import RequestException
+from urllib3.util.retry import Retry
 
-import json
 import argparse
+import functools
 import os
+import random
 import re
 import requests
 import sys
 import time
-import warnings
-import yaml
+import urllib3
 
-warnings.filterwarnings("ignore")
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+try:
+    from orjson import dumps as json_dumps, loads as json_loads
+except ImportError:
+    from json import dumps as json_dumps, loads as json_loads
 
 RETRIES = 15
 
+# Fallback job ID scan for firmware that returns neither a Members list nor
+# a Location header. Compiled once and run against the raw response bytes.
+_JOB_ID_RE = re.compile(rb"[JR]ID_[^'\",}]+")
+
+
+@functools.lru_cache(maxsize=8)
+def _load_definitions(_interfaces_path):
+    # yaml is imported lazily so flows that never read the interfaces file
+    # don't pay the PyYAML import cost on every invocation.
+    import yaml
+
+    try:
+        from yaml import CSafeLoader as _Loader
+    except ImportError:
+        from yaml import SafeLoader as _Loader
+
+    with open(_interfaces_path, "r") as f:
+        return yaml.load(f, Loader=_Loader)
+
 
 class Badfish:
     def __init__(self, _host, _username, _password, logger, _retries=RETRIES):
@@ -29,10 +56,50 @@ class Badfish:
         self.redfish_uri = "/redfish/v1"
         self.root_uri = "%s%s" % (self.host_uri, self.redfish_uri)
         self.logger = logger
+        self.session = requests.Session()
+        self.session.auth = (_username, _password)
+        self.session.verify = False
+        self.session.headers.update({"content-type": "application/json"})
+        _retry_methods = frozenset(["GET", "POST", "PATCH", "DELETE"])
+        try:
+            _retry = Retry(
+                total=3,
+                backoff_factor=1.0,
+                status_forcelist=[429, 500, 502, 503, 504],
+                allowed_methods=_retry_methods,
+                respect_retry_after_header=True,
+            )
+        except TypeError:
+            # urllib3 < 1.26 spells the option method_whitelist and older
+            # releases predate respect_retry_after_header.
+            _retry = Retry(
+                total=3,
+                backoff_factor=1.0,
+                status_forcelist=[429, 500, 502, 503, 504],
+                method_whitelist=_retry_methods,
+            )
+        self.session.mount(
+            "https://", HTTPAdapter(max_retries=_retry, pool_connections=4, pool_maxsize=10)
+        )
+        self._root_data = None
+        self._bios_boot_mode = None
+        self._host_model = None
         self.system_resource = self.find_systems_resource()
         self.manager_resource = self.find_managers_resource()
+        self.system_uri = "%s%s" % (self.host_uri, self.system_resource)
+        self.manager_uri = "%s%s" % (self.host_uri, self.manager_resource)
+        self.jobs_uri = "%s/Jobs" % self.manager_uri
         self.bios_uri = "%s/Bios/Settings" % self.system_resource[len(self.redfish_uri):]
 
+    @property
+    def host_model(self):
+        if self._host_model is None:
+            host_model = self.host.split(".")[0].split("-")[-1]
+            if host_model.startswith("r"):
+                host_model = host_model[1:]
+            self._host_model = host_model
+        return self._host_model
+
     @staticmethod
     def progress_bar(value, end_value, state, bar_length=20):
         percent = float(value) / end_value
@@ -46,9 +113,14 @@ class Badfish:
         )
         sys.stdout.flush()
 
+    def _backoff_sleep(self, attempt, base=1.0, cap=30.0):
+        delay = random.uniform(0, min(cap, base * 2 ** attempt))
+        self.logger.debug("Backing off %.2f seconds before polling again.", delay)
+        time.sleep(delay)
+
     def error_handler(self, _response):
         try:
-            data = _response.json()
+            data = json_loads(_response.content)
         except ValueError:
             self.logger.error("Error reading response from host.")
             sys.exit(1)
@@ -59,9 +131,15 @@ class Badfish:
 
         sys.exit(1)
 
-    def get_request(self, uri, _continue=False):
+    def _request(self, method, uri, payload=None, headers=None, _continue=False):
         try:
-            _response = requests.get(uri, auth=(self.username, self.password), verify=False, timeout=60)
+            _response = self.session.request(
+                method,
+                uri,
+                data=json_dumps(payload) if payload is not None else None,
+                headers=headers,
+                timeout=60,
+            )
         except RequestException:
             self.logger.exception("Failed to communicate with server.")
             if _continue:
@@ -70,49 +148,17 @@ class Badfish:
                 sys.exit(1)
         return _response
 
+    def get_request(self, uri, _continue=False):
+        return self._request("get", uri, _continue=_continue)
+
     def post_request(self, uri, payload, headers):
-        try:
-            _response = requests.post(
-                uri,
-                data=json.dumps(payload),
-                headers=headers,
-                verify=False,
-                auth=(self.username, self.password)
-            )
-        except RequestException:
-            self.logger.exception("Failed to communicate with server.")
-            sys.exit(1)
-        return _response
+        return self._request("post", uri, payload=payload, headers=headers)
 
     def patch_request(self, uri, payload, headers, _continue=False):
-        try:
-            _response = requests.patch(
-                uri,
-                data=json.dumps(payload),
-                headers=headers,
-                verify=False,
-                auth=(self.username, self.password)
-            )
-        except RequestException:
-            self.logger.exception("Failed to communicate with server.")
-            if _continue:
-                return
-            else:
-                sys.exit(1)
-        return _response
+        return self._request("patch", uri, payload=payload, headers=headers, _continue=_continue)
 
     def delete_request(self, uri, headers):
-        try:
-            requests.delete(
-                uri,
-                headers=headers,
-                verify=False,
-                auth=(self.username, self.password)
-            )
-        except RequestException:
-            self.logger.exception("Failed to communicate with server.")
-            sys.exit(1)
-        return
+        return self._request("delete", uri, headers=headers)
 
     def get_boot_seq(self):
         bios_boot_mode = self.get_bios_boot_mode()
@@ -121,27 +167,30 @@ class Badfish:
         else:
             return "BootSeq"
 
-    def get_bios_boot_mode(self):
+    def get_bios_boot_mode(self, refresh=False):
+        if self._bios_boot_mode and not refresh:
+            return self._bios_boot_mode
+
         self.logger.debug("Getting bios boot mode.")
-        _uri = "%s%s/Bios" % (self.host_uri, self.system_resource)
+        _uri = "%s/Bios" % self.system_uri
         _response = self.get_request(_uri)
 
         try:
-            data = _response.json()
+            data = json_loads(_response.content)
         except ValueError:
             self.logger.error("Could not retrieve Bios Boot mode.")
             sys.exit(1)
 
         try:
-            bios_boot_mode = data[u"Attributes"]["BootMode"]
-            return bios_boot_mode
+            self._bios_boot_mode = data[u"Attributes"]["BootMode"]
         except KeyError:
             self.logger.warning("Could not retrieve Bios Attributes. Assuming Bios.")
-            return "Bios"
+            self._bios_boot_mode = "Bios"
+        return self._bios_boot_mode
 
     def get_boot_devices(self):
         _boot_seq = self.get_boot_seq()
-        _uri = "%s%s/BootSources" % (self.host_uri, self.system_resource)
+        _uri = "%s/BootSources" % self.system_uri
         _response = self.get_request(_uri)
 
         if _response.status_code == 404:
@@ -149,7 +198,7 @@ class Badfish:
             self.logger.error("Boot order modification is not supported by this host.")
             sys.exit(1)
 
-        data = _response.json()
+        data = json_loads(_response.content)
         if "Attributes" in data:
             return data[u"Attributes"][_boot_seq]
         else:
@@ -159,20 +208,20 @@ class Badfish:
 
     def get_job_queue(self):
         self.logger.debug("Getting job queue.")
-        _url = "%s%s/Jobs" % (self.host_uri, self.manager_resource)
-        _response = self.get_request(_url)
+        _response = self.get_request(self.jobs_uri)
+
+        data = json_loads(_response.content)
+        if "Members" in data:
+            jobs = [member[u"@odata.id"].rsplit("/", 1)[-1] for member in data[u"Members"]]
+            return [job for job in jobs if job.startswith(("JID_", "RID_"))]
 
-        data = _response.json()
-        data = str(data)
-        job_queue = re.findall("[JR]ID_.+?'", data)
-        jobs = [job.strip("}").strip("\"").strip("'") for job in job_queue]
-        return jobs
+        return [job.decode("utf-8") for job in _JOB_ID_RE.findall(_response.content)]
 
     def get_job_status(self, _job_id):
         self.logger.debug("Getting job status.")
-        _uri = "%s%s/Jobs/%s" % (self.host_uri, self.manager_resource, _job_id)
+        _uri = "%s/%s" % (self.jobs_uri, _job_id)
 
-        for _ in range(self.retries):
+        for _attempt in range(self.retries):
             _response = self.get_request(_uri, _continue=True)
             if not _response:
                 continue
@@ -180,18 +229,18 @@ class Badfish:
             status_code = _response.status_code
             if status_code == 200:
                 self.logger.info("Command passed to check job status, code 200 returned.")
-                time.sleep(10)
             else:
-                self.logger.error("Command failed to check job status, return code is %s." % status_code)
+                self.logger.error("Command failed to check job status, return code is %s.", status_code)
 
                 self.error_handler(_response)
 
-            data = _response.json()
+            data = json_loads(_response.content)
             if data[u"Message"] == "Task successfully scheduled.":
-                self.logger.info("Job id %s successfully scheduled." % _job_id)
+                self.logger.info("Job id %s successfully scheduled.", _job_id)
                 return
             else:
-                self.logger.warning("JobStatus not scheduled, current status is: %s." % data[u"Message"])
+                self.logger.warning("JobStatus not scheduled, current status is: %s.", data[u"Message"])
+                self._backoff_sleep(_attempt)
 
         self.logger.error("Not able to successfully schedule the job.")
         sys.exit(1)
@@ -200,41 +249,42 @@ class Badfish:
         boot_devices = self.get_boot_devices()
 
         if _interfaces_path:
-            with open(_interfaces_path, "r") as f:
-                try:
-                    definitions = yaml.safe_load(f)
-                except yaml.YAMLError as ex:
-                    self.logger.error("Couldn't read file: %s" % _interfaces_path)
-                    self.logger.debug(ex)
-                    sys.exit(1)
+            import yaml
 
-            host_model = self.host.split(".")[0].split("-")[-1]
-            if host_model.startswith("r"):
-                host_model = host_model[1:]
-            interfaces = {}
+            try:
+                definitions = _load_definitions(_interfaces_path)
+            except yaml.YAMLError as ex:
+                self.logger.error("Couldn't read file: %s", _interfaces_path)
+                self.logger.debug(ex)
+                sys.exit(1)
+
+            sorted_devices = sorted(boot_devices, key=lambda device: device[u"Index"])
             for _host in ["foreman", "director"]:
-                match = True
-                interfaces[_host] = definitions["%s_%s_interfaces" % (_host, host_model)].split(",")
-                for device in sorted(boot_devices[: len(interfaces)], key=lambda x: x[u"Index"]):
-                    if device[u"Name"] == interfaces[_host][device[u"Index"]]:
-                        continue
-                    else:
-                        match = False
-                        break
-                if match:
+                interfaces = definitions["%s_%s_interfaces" % (_host, self.host_model)].split(",")
+                if all(
+                    device[u"Name"] == interface
+                    for device, interface in zip(sorted_devices, interfaces)
+                ):
                     return _host
 
         return None
 
-    def find_systems_resource(self):
-        response = self.get_request(self.root_uri)
+    def get_service_root(self):
+        if self._root_data is None:
+            response = self.get_request(self.root_uri)
 
-        if response.status_code == 401:
-            self.logger.error("Failed to authenticate. Verify your credentials.")
-            sys.exit(1)
+            if response.status_code == 401:
+                self.logger.error("Failed to authenticate. Verify your credentials.")
+                sys.exit(1)
+
+            if response:
+                self._root_data = json_loads(response.content)
+        return self._root_data
+
+    def find_systems_resource(self):
+        data = self.get_service_root()
 
-        if response:
-            data = response.json()
+        if data is not None:
             if 'Systems' not in data:
                 self.logger.error("Systems resource not found")
                 sys.exit(1)
@@ -242,20 +292,19 @@ class Badfish:
                 systems = data["Systems"]["@odata.id"]
                 _response = self.get_request(self.host_uri + systems)
                 if _response:
-                    data = _response.json()
+                    data = json_loads(_response.content)
                     if data.get(u'Members'):
                         for member in data[u'Members']:
                             systems_service = member[u'@odata.id']
-                            self.logger.info("Systems service: %s." % systems_service)
+                            self.logger.info("Systems service: %s.", systems_service)
                             return systems_service
                     else:
                         self.logger.error("ComputerSystem's Members array is either empty or missing")
                         sys.exit(1)
 
     def find_managers_resource(self):
-        response = self.get_request(self.root_uri)
-        if response:
-            data = response.json()
+        data = self.get_service_root()
+        if data is not None:
             if 'Managers' not in data:
                 self.logger.error("Managers resource not found")
                 sys.exit(1)
@@ -263,30 +312,29 @@ class Badfish:
                 managers = data["Managers"]["@odata.id"]
                 response = self.get_request(self.host_uri + managers)
                 if response:
-                    data = response.json()
+                    data = json_loads(response.content)
                     if data.get(u'Members'):
                         for member in data[u'Members']:
                             managers_service = member[u'@odata.id']
-                            self.logger.info("Managers service: %s." % managers_service)
+                            self.logger.info("Managers service: %s.", managers_service)
                             return managers_service
                     else:
                         self.logger.error("Manager's Members array is either empty or missing")
                         sys.exit(1)
 
     def get_power_state(self):
-        _uri = '%s%s' % (self.host_uri, self.system_resource)
-        self.logger.debug("url: %s" % _uri)
+        self.logger.debug("url: %s", self.system_uri)
 
-        _response = self.get_request(_uri, _continue=True)
+        _response = self.get_request(self.system_uri, _continue=True)
         if not _response:
             return "Down"
 
         if _response.ok:
-            data = _response.json()
+            data = json_loads(_response.content)
         else:
             self.logger.debug("Couldn't get power state. Retrying.")
             return "Down"
-        self.logger.debug("Current server power state is: %s." % data[u'PowerState'])
+        self.logger.debug("Current server power state is: %s.", data[u'PowerState'])
 
         return data[u'PowerState']
 
@@ -297,7 +345,7 @@ class Badfish:
 
         if interfaces_path:
             if not os.path.exists(interfaces_path):
-                self.logger.error("No such file or directory: %s." % interfaces_path)
+                self.logger.error("No such file or directory: %s.", interfaces_path)
                 sys.exit(1)
         else:
             self.logger.error(
@@ -323,7 +371,7 @@ class Badfish:
                 self.reboot_server(graceful=False)
 
             else:
-                self.logger.error("Couldn't communicate with host after %s attempts." % self.retries)
+                self.logger.error("Couldn't communicate with host after %s attempts.", self.retries)
                 sys.exit(1)
         else:
             self.logger.warning(
@@ -332,27 +380,24 @@ class Badfish:
         return True
 
     def change_boot_order(self, _interfaces_path, _host_type):
-        with open(_interfaces_path, "r") as f:
-            try:
-                definitions = yaml.safe_load(f)
-            except yaml.YAMLError as ex:
-                self.logger.error(ex)
-                sys.exit(1)
+        import yaml
+
+        try:
+            definitions = _load_definitions(_interfaces_path)
+        except yaml.YAMLError as ex:
+            self.logger.error(ex)
+            sys.exit(1)
 
-        host_model = self.host.split(".")[0].split("-")[-1]
-        if host_model.startswith("r"):
-            host_model = host_model[1:]
-        interfaces = definitions["%s_%s_interfaces" % (_host_type, host_model)].split(",")
+        interfaces = definitions["%s_%s_interfaces" % (_host_type, self.host_model)].split(",")
 
         boot_devices = self.get_boot_devices()
+        devices_by_name = {device[u"Name"]: device for device in boot_devices}
         change = False
-        for i in range(len(interfaces)):
-            for device in boot_devices:
-                if interfaces[i] == device[u"Name"]:
-                    if device[u"Index"] != i:
-                        device[u"Index"] = i
-                        change = True
-                    break
+        for i, interface in enumerate(interfaces):
+            device = devices_by_name.get(interface)
+            if device and device[u"Index"] != i:
+                device[u"Index"] = i
+                change = True
 
         if change:
             self.patch_boot_seq(boot_devices)
@@ -363,8 +408,7 @@ class Badfish:
 
     def patch_boot_seq(self, boot_devices):
         _boot_seq = self.get_boot_seq()
-        boot_sources_uri = "%s/BootSources/Settings" % self.system_resource
-        url = "%s%s" % (self.host_uri, boot_sources_uri)
+        url = "%s/BootSources/Settings" % self.system_uri
         payload = {"Attributes": {_boot_seq: boot_devices}}
         headers = {"content-type": "application/json"}
         response = None
@@ -387,17 +431,15 @@ class Badfish:
                 self.error_handler(response)
 
     def set_next_boot_pxe(self):
-        _url = "%s%s" % (self.host_uri, self.system_resource)
+        _url = self.system_uri
         _payload = {"Boot": {"BootSourceOverrideTarget": "Pxe"}}
         _headers = {"content-type": "application/json"}
         _response = self.patch_request(_url, _payload, _headers)
 
-        time.sleep(5)
-
         if _response.status_code == 200:
-            self.logger.info('PATCH command passed to set next boot onetime boot device to: "%s".' % "Pxe")
+            self.logger.info('PATCH command passed to set next boot onetime boot device to: "%s".', "Pxe")
         else:
-            self.logger.error("Command failed, error code is %s." % _response.status_code)
+            self.logger.error("Command failed, error code is %s.", _response.status_code)
 
             self.error_handler(_response)
 
@@ -416,24 +458,27 @@ class Badfish:
         _headers = {'content-type': 'application/json'}
         response = self.post_request(_url, _payload, _headers)
         if response.status_code == 200:
-            self.logger.info("Job queue for iDRAC %s successfully cleared." % self.host)
+            self.logger.info("Job queue for iDRAC %s successfully cleared.", self.host)
         else:
             self.logger.error("Job queue not cleared, there was something wrong with your request.")
             sys.exit(1)
 
     def clear_job_list(self, _job_queue):
-        _url = "%s%s/Jobs" % (self.host_uri, self.manager_resource)
+        _url = self.jobs_uri
         _headers = {"content-type": "application/json"}
-        self.logger.warning("Clearing job queue for job IDs: %s." % _job_queue)
-        for _job in _job_queue:
-            job = _job.strip("'")
-            url = "/".join([_url, job])
-            self.delete_request(url, _headers)
+        self.logger.warning("Clearing job queue for job IDs: %s.", _job_queue)
+        with ThreadPoolExecutor(max_workers=min(8, len(_job_queue))) as executor:
+            futures = [
+                executor.submit(self.delete_request, "/".join([_url, _job.strip("'")]), _headers)
+                for _job in _job_queue
+            ]
+            for future in futures:
+                future.result()
         job_queue = self.get_job_queue()
         if not job_queue:
-            self.logger.info("Job queue for iDRAC %s successfully cleared." % self.host)
+            self.logger.info("Job queue for iDRAC %s successfully cleared.", self.host)
         else:
-            self.logger.error("Job queue not cleared, current job queue contains jobs: %s." % job_queue)
+            self.logger.error("Job queue not cleared, current job queue contains jobs: %s.", job_queue)
             sys.exit(1)
 
     def clear_job_queue(self):
@@ -445,7 +490,7 @@ class Badfish:
                 self.clear_job_list(_job_queue)
         else:
             self.logger.warning(
-                "Job queue already cleared for iDRAC %s, DELETE command will not execute." % self.host
+                "Job queue already cleared for iDRAC %s, DELETE command will not execute.", self.host
             )
 
     def create_job(self, _url, _payload, _headers, expected=200):
@@ -456,24 +501,25 @@ class Badfish:
         if status_code == expected:
             self.logger.info("POST command passed to create target config job.")
         else:
-            self.logger.error("POST command failed to create BIOS config job, status code is %s." % status_code)
+            self.logger.error("POST command failed to create BIOS config job, status code is %s.", status_code)
 
             self.error_handler(_response)
 
-        convert_to_string = str(_response.__dict__)
-        job_id_search = re.search("[RJ]ID_.+?,", convert_to_string).group()
-        _job_id = re.sub("[,']", "", job_id_search).strip("}").strip("\"").strip("'")
-        self.logger.info("%s job ID successfully created." % _job_id)
+        _job_id = _response.headers.get("Location", "").rsplit("/", 1)[-1]
+        if not _job_id.startswith(("JID_", "RID_")):
+            # Older iDRAC firmware omits the job URI from the Location header.
+            _job_id = _JOB_ID_RE.search(_response.content).group().decode("utf-8")
+        self.logger.info("%s job ID successfully created.", _job_id)
         return _job_id
 
     def create_bios_config_job(self, uri):
-        _url = "%s%s/Jobs" % (self.host_uri, self.manager_resource)
+        _url = self.jobs_uri
         _payload = {"TargetSettingsURI": "%s%s" % (self.redfish_uri, uri)}
         _headers = {"content-type": "application/json"}
         return self.create_job(_url, _payload, _headers)
 
     def send_reset(self, reset_type):
-        _url = "%s%s/Actions/ComputerSystem.Reset" % (self.host_uri, self.system_resource)
+        _url = "%s/Actions/ComputerSystem.Reset" % self.system_uri
         _payload = {"ResetType": reset_type}
         _headers = {"content-type": "application/json"}
         _response = self.post_request(_url, _payload, _headers)
@@ -481,22 +527,21 @@ class Badfish:
         status_code = _response.status_code
         if status_code in [200, 204]:
             self.logger.info(
-                "Command passed to %s server, code return is %s." % (reset_type, status_code)
+                "Command passed to %s server, code return is %s.", reset_type, status_code
             )
-            time.sleep(10)
         elif status_code == 409:
             self.logger.warning(
-                "Command failed to %s server, host appears to be already in that state." % reset_type
+                "Command failed to %s server, host appears to be already in that state.", reset_type
             )
         else:
             self.logger.error(
-                "Command failed to %s server, status code is: %s." % (reset_type, status_code)
+                "Command failed to %s server, status code is: %s.", reset_type, status_code
             )
 
             self.error_handler(_response)
 
     def reboot_server(self, graceful=True):
-        self.logger.debug("Rebooting server: %s." % self.host)
+        self.logger.debug("Rebooting server: %s.", self.host)
         power_state = self.get_power_state()
         if power_state.lower() == "on":
             if graceful:
@@ -519,20 +564,20 @@ class Badfish:
 
     def reset_idrac(self):
         self.logger.debug("Running reset iDRAC.")
-        _url = "%s%s/Actions/Manager.Reset/" % (self.host_uri, self.manager_resource)
+        _url = "%s/Actions/Manager.Reset/" % self.manager_uri
         _payload = {"ResetType": "GracefulRestart"}
         _headers = {'content-type': 'application/json'}
-        self.logger.debug("url: %s" % _url)
-        self.logger.debug("payload: %s" % _payload)
-        self.logger.debug("headers: %s" % _headers)
+        self.logger.debug("url: %s", _url)
+        self.logger.debug("payload: %s", _payload)
+        self.logger.debug("headers: %s", _headers)
         _response = self.post_request(_url, _payload, _headers)
 
         status_code = _response.status_code
         if status_code == 204:
-            self.logger.info("Status code %s returned for POST command to reset iDRAC." % status_code)
+            self.logger.info("Status code %s returned for POST command to reset iDRAC.", status_code)
         else:
-            data = _response.json()
-            self.logger.error("Status code %s returned, error is: \n%s." % (status_code, data))
+            data = json_loads(_response.content)
+            self.logger.error("Status code %s returned, error is: \n%s.", status_code, data)
             sys.exit(1)
         time.sleep(15)
 
@@ -559,7 +604,7 @@ class Badfish:
 
         if _interfaces_path:
             if not os.path.exists(_interfaces_path):
-                self.logger.error("No such file or directory: %s." % _interfaces_path)
+                self.logger.error("No such file or directory: %s.", _interfaces_path)
                 sys.exit(1)
 
         device = self.get_host_type_boot_device(host_type, _interfaces_path)
@@ -578,7 +623,7 @@ class Badfish:
                 self.logger.info("Command passed to set BIOS attribute pending values.")
                 break
             else:
-                self.logger.error("Command failed, error code is: %s." % status_code)
+                self.logger.error("Command failed, error code is: %s.", status_code)
                 if status_code == 503 and i - 1 != self.retries:
                     self.logger.info("Retrying to send one time boot.")
                     continue
@@ -596,36 +641,36 @@ class Badfish:
             _host_type = self.get_host_type(_interfaces_path)
 
             if _host_type:
-                self.logger.warning("Current boot order is set to: %s." % _host_type)
+                self.logger.warning("Current boot order is set to: %s.", _host_type)
             else:
                 boot_devices = self.get_boot_devices()
 
                 self.logger.warning("Current boot order does not match any of the given.")
                 self.logger.info("Current boot order:")
                 for device in sorted(boot_devices, key=lambda x: x[u"Index"]):
-                    self.logger.info("%s: %s" % (int(device[u"Index"]) + 1, device[u"Name"]))
+                    self.logger.info("%s: %s", int(device[u"Index"]) + 1, device[u"Name"])
 
         else:
             boot_devices = self.get_boot_devices()
             self.logger.info("Current boot order:")
             for device in sorted(boot_devices, key=lambda x: x[u"Index"]):
-                self.logger.info("%s: %s" % (int(device[u"Index"]) + 1, device[u"Name"]))
+                self.logger.info("%s: %s", int(device[u"Index"]) + 1, device[u"Name"])
         return True
 
     def check_device(self, device):
-        self.logger.debug("Checking device %s." % device)
+        self.logger.debug("Checking device %s.", device)
         devices = self.get_boot_devices()
         self.logger.debug(devices)
         boot_devices = [_device["Name"].lower() for _device in devices]
         if device.lower() in boot_devices:
             return True
         else:
-            self.logger.error("Device %s does not match any of the existing for host %s" % (device, self.host))
+            self.logger.error("Device %s does not match any of the existing for host %s", device, self.host)
             return False
 
     def polling_host_state(self, state, equals=True):
         state_str = "Not %s" % state if not equals else state
-        self.logger.info("Polling for host state: %s" % state_str)
+        self.logger.info("Polling for host state: %s", state_str)
         desired_state = False
         for count in range(self.retries):
             current_state = self.get_power_state()
@@ -633,11 +678,11 @@ class Badfish:
                 desired_state = current_state.lower() == state.lower()
             else:
                 desired_state = current_state.lower() != state.lower()
-            time.sleep(5)
             if desired_state:
                 self.progress_bar(self.retries, self.retries, current_state)
                 break
             self.progress_bar(count, self.retries, current_state)
+            self._backoff_sleep(count, cap=15.0)
 
         return desired_state
 
@@ -648,7 +693,7 @@ class Badfish:
         _response = self.get_request(_url)
 
         try:
-            data = _response.json()
+            data = json_loads(_response.content)
         except ValueError:
             self.logger.error("Not able to access Firmware inventory.")
             sys.exit(1)
@@ -664,23 +709,22 @@ class Badfish:
                 installed_devices.append(a)
 
         for device in installed_devices:
-            self.logger.debug("Getting device info for %s" % device)
+            self.logger.debug("Getting device info for %s", device)
             _uri = '%s/UpdateService/FirmwareInventory/%s' % (self.root_uri, device)
 
             _response = self.get_request(_uri, _continue=True)
             if not _response:
                 continue
 
-            data = _response.json()
+            data = json_loads(_response.content)
             for info in data.items():
                 if "odata" not in info[0] and "Description" not in info[0]:
-                    self.logger.info("%s: %s" % (info[0], info[1]))
+                    self.logger.info("%s: %s", info[0], info[1])
 
             self.logger.info("*" * 48)
 
     def export_configuration(self):
-        _url = '%s%s/Actions/' \
-               'Oem/EID_674_Manager.ExportSystemConfiguration' % (self.host_uri, self.manager_resource)
+        _url = '%s/Actions/Oem/EID_674_Manager.ExportSystemConfiguration' % self.manager_uri
         _payload = {"ExportFormat": "XML", "ShareParameters": {"Target": "ALL"},
                     "IncludeInExport": "IncludeReadOnly,IncludePasswordHashValues"}
         _headers = {'content-type': 'application/json'}
@@ -696,7 +740,7 @@ class Badfish:
 
             data = _response.__dict__
             if "<SystemConfiguration Model" in str(data):
-                self.logger.info("Export job ID %s successfully completed." % job_id)
+                self.logger.info("Export job ID %s successfully completed.", job_id)
 
                 filename = "%s_export.xml" % self.host
 
@@ -704,39 +748,37 @@ class Badfish:
                     _content = data["_content"]
                     _file.writelines(["%s\n" % line.decode("utf-8") for line in _content.split(b"\n")])
 
-                self.logger.info("Exported attributes saved in file: %s" % filename)
+                self.logger.info("Exported attributes saved in file: %s", filename)
 
                 return
             else:
                 pass
 
             status_code = _response.status_code
-            data = _response.json()
+            data = json_loads(_response.content)
 
             if status_code == 202 or status_code == 200:
-                self.logger.info("JobStatus not completed, current status: \"%s\", percent complete: \"%s\"" % (
-                    data[u'Oem'][u'Dell'][u'Message'], data[u'Oem'][u'Dell'][u'PercentComplete']))
+                self.logger.info("JobStatus not completed, current status: \"%s\", percent complete: \"%s\"",
+                                 data[u'Oem'][u'Dell'][u'Message'], data[u'Oem'][u'Dell'][u'PercentComplete'])
                 time.sleep(1)
             else:
-                self.logger.error("Execute job ID command failed, error code is: %s" % status_code)
+                self.logger.error("Execute job ID command failed, error code is: %s", status_code)
                 sys.exit(1)
 
-        self.logger.error("Could not export settings after %s attempts." % self.retries)
+        self.logger.error("Could not export settings after %s attempts.", self.retries)
 
     def get_host_type_boot_device(self, host_type, _interfaces_path):
         if _interfaces_path:
-            with open(_interfaces_path, "r") as f:
-                try:
-                    definitions = yaml.safe_load(f)
-                except yaml.YAMLError as ex:
-                    self.logger.error("Couldn't read file: %s" % _interfaces_path)
-                    self.logger.debug(ex)
-                    sys.exit(1)
+            import yaml
 
-            host_model = self.host.split(".")[0].split("-")[-1]
-            if host_model.startswith("r"):
-                host_model = host_model[1:]
-            return definitions["%s_%s_interfaces" % (host_type, host_model)].split(",")[0]
+            try:
+                definitions = _load_definitions(_interfaces_path)
+            except yaml.YAMLError as ex:
+                self.logger.error("Couldn't read file: %s", _interfaces_path)
+                self.logger.debug(ex)
+                sys.exit(1)
+
+            return definitions["%s_%s_interfaces" % (host_type, self.host_model)].split(",")[0]
         return None
 
 
@@ -759,35 +801,38 @@ def execute_badfish(_host, _args, logger):
 
     badfish = Badfish(_host, username, password, logger, retries)
 
-    if _args["host_list"]:
-        badfish.logger.info("Executing actions on host: %s" % _host)
-
-    if device:
-        badfish.boot_to(device)
-    elif boot_to_type:
-        badfish.boot_to_type(boot_to_type, interfaces_path)
-    elif check_boot:
-        badfish.check_boot(interfaces_path)
-    elif firmware_inventory:
-        badfish.get_firmware_inventory()
-    elif export_configuration:
-        badfish.export_configuration()
-    elif clear_jobs:
-        badfish.clear_job_queue()
-    elif host_type:
-        badfish.change_boot(host_type, interfaces_path, pxe)
-    elif racreset:
-        badfish.reset_idrac()
-    elif power_cycle:
-        badfish.reboot_server(graceful=False)
-    elif reboot_only:
-        badfish.reboot_server()
-
-    if pxe and not host_type:
-        badfish.set_next_boot_pxe()
-
-    if _args["host_list"]:
-        badfish.logger.info("*" * 48)
+    try:
+        if _args["host_list"]:
+            badfish.logger.info("Executing actions on host: %s", _host)
+
+        if device:
+            badfish.boot_to(device)
+        elif boot_to_type:
+            badfish.boot_to_type(boot_to_type, interfaces_path)
+        elif check_boot:
+            badfish.check_boot(interfaces_path)
+        elif firmware_inventory:
+            badfish.get_firmware_inventory()
+        elif export_configuration:
+            badfish.export_configuration()
+        elif clear_jobs:
+            badfish.clear_job_queue()
+        elif host_type:
+            badfish.change_boot(host_type, interfaces_path, pxe)
+        elif racreset:
+            badfish.reset_idrac()
+        elif power_cycle:
+            badfish.reboot_server(graceful=False)
+        elif reboot_only:
+            badfish.reboot_server()
+
+        if pxe and not host_type:
+            badfish.set_next_boot_pxe()
+
+        if _args["host_list"]:
+            badfish.logger.info("*" * 48)
+    finally:
+        badfish.session.close()
 
 
 def main(argv=None):
@@ -837,7 +882,7 @@ def main(argv=None):
                         continue
         except IOError as ex:
             logger.debug(ex)
-            logger.error("There was something wrong reading from %s" % host_list)
+            logger.error("There was something wrong reading from %s", host_list)
     elif not host:
         logger.error("You must specify at least either a host (-H) or a host list (--host-list).")
     else: